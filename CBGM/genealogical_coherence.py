@@ -339,10 +339,22 @@ class GenealogicalCoherence(Coherence):
         """
         Return a list of possible parent combinations that explain this reading.
 
+        See iter_parent_combinations for details.
+        """
+        return list(self.iter_parent_combinations(reading, parent_reading, max_rank=max_rank, min_perc=min_perc,
+                                                  include_undirected=include_undirected, my_gen=my_gen))
+
+    def iter_parent_combinations(self, reading, parent_reading, *, max_rank=None, min_perc=None,
+                                 include_undirected=False, my_gen=1):
+        """
+        Generate the possible parent combinations that explain this reading.
+        The (potentially large) product of combinations for split parent
+        readings is generated lazily rather than built as a list.
+
         If the parent_reading is of length 3 (e.g. c&d&e) then the combinations
         will be length 3 or less.
 
-        Returns a list of lists or ParentCombination objects, e.g.:
+        Yields lists of ParentCombination objects, e.g.:
             [
              # 05 explains this reading by itself
              [('05' = witness, 4 = rank, 1 = generation)],
@@ -409,7 +421,8 @@ class GenealogicalCoherence(Coherence):
 
         if parent_reading in (INIT, OL_PARENT, UNCL):
             # No parents - nothing further to do
-            return ret
+            yield from ret
+            return
 
         # Now the parent reading
         partial_explanations = []
@@ -459,19 +472,18 @@ class GenealogicalCoherence(Coherence):
 
         if not partial_explanations:
             # We couldn't find anything
-            return []
+            return
 
         if len(partial_explanations) == 1:
             # We've got a single parent - simple
-            ret.extend(partial_explanations[0])
-            return ret
+            yield from ret
+            yield from partial_explanations[0]
 
         else:
             # We now combine the lists in such a way as to get the same structure
             # as above but now with (potentially) multiple tuples in the inner lists.
-            prod = product(*partial_explanations)
-            combined = list(list(set(chain(*x))) for x in prod)
-            return combined
+            for x in product(*partial_explanations):
+                yield list(set(chain(*x)))
 
 
 def generate_genealogical_coherence_cache(w1, db_file, min_strength=None):
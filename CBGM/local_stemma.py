@@ -1,35 +1,39 @@
 # encoding: utf-8
 
-import networkx
+import pygraphviz
 import sqlite3
-import subprocess
 import logging
-import re
 import os
-from tempfile import NamedTemporaryFile
+import io
 from .shared import INIT, OL_PARENT, UNCL, sort_mss
 logger = logging.getLogger(__name__)
 
 
-def _post_process_dot(dotfile):
-    """
-    Post-process a dot file created by networkx to make it create a prettier
-    local stemma.
+NODE_ATTRS = "shape=plaintext; fontsize=12; height=0.4; width=0.4; fixedsize=true"
+EDGE_ATTRS = "arrowsize=0.5"
+DOT_ESCAPES = str.maketrans({'"': '\\"', '\\': '\\\\'})
+
+
+def _emit_dot(out, nodes, edges):
     """
-    re_node = re.compile("[^ ]+;")
-    re_edge = re.compile("[^ ]+ -> [^ ]+;")
+    Write a local stemma in dot format to the file-like object out.
 
-    output = []
-    with open(dotfile) as df:
-        for line in df:
-            if re_node.match(line.strip()):
-                line = line.replace(';', ' [shape=plaintext; fontsize=12; height=0.4; width=0.4; fixedsize=true];')
-            elif re_edge.match(line.strip()):
-                line = line.replace(';', ' [arrowsize=0.5];')
-            output.append(line)
+    @param nodes: list of node names
+    @param edges: dict of node name to list of child node names
+    """
+    def quote(x):
+        return '"{}"'.format(x.translate(DOT_ESCAPES))
 
-    with open(dotfile, 'w') as w:
-        w.write(''.join(output))
+    out.write("strict digraph G {\n")
+    # Every node and edge looks the same, so just set the defaults once
+    out.write("node [{}];\n".format(NODE_ATTRS))
+    out.write("edge [{}];\n".format(EDGE_ATTRS))
+    for node in nodes:
+        out.write("{};\n".format(quote(node)))
+    for node in nodes:
+        for child in edges.get(node, []):
+            out.write("{} -> {};\n".format(quote(node), quote(child)))
+    out.write("}\n")
 
 
 def local_stemma(db_file, variant_units, suffix='', path='.'):
@@ -51,8 +55,6 @@ def _one_local_stemma(db_file, variant_unit, suffix='', path='.'):
     """
     output_file = os.path.join(path, "{}{}.svg".format(variant_unit.replace('/', '_'), suffix))
 
-    G = networkx.DiGraph()
-
     sql = """SELECT label, parent
              FROM cbgm
              WHERE variant_unit = ?
@@ -60,34 +62,35 @@ def _one_local_stemma(db_file, variant_unit, suffix='', path='.'):
     conn = sqlite3.connect(db_file)
     cursor = conn.cursor()
     data = list(cursor.execute(sql, (variant_unit, )))
-    labels = [x[0] for x in data]
 
-    G.add_nodes_from(labels)
+    # Nodes and edges, in the order they're first seen (dicts as ordered sets)
+    nodes = {x[0]: None for x in data}
+    edges = {}
+
+    def add_edge(parent, child):
+        nodes.setdefault(parent)
+        edges.setdefault(parent, {})[child] = None
 
-    added_uncl = False
     for label, parent in data:
         if parent in (INIT, OL_PARENT):
             # We don't show a separate blob for this
             pass
         elif parent == UNCL:
-            if not added_uncl:
-                G.add_node('?')
-                added_uncl = True
-            G.add_edge('?', label)
+            add_edge('?', label)
         elif parent:
             for p in parent.split('&'):
                 # multiple parents are separated by '&'
-                G.add_edge(p.strip(), label)
+                add_edge(p.strip(), label)
         else:
             print("WANRNING - {} has no parents".format(label))
             continue
 
-    print("Creating graph with {} nodes and {} edges".format(G.number_of_nodes(),
-                                                             G.number_of_edges()))
-    with NamedTemporaryFile() as dotfile:
-        networkx.write_dot(G, dotfile.name)
-        _post_process_dot(dotfile.name)
-        subprocess.check_call(['dot', '-Tsvg', dotfile.name, '-o', output_file])
+    print("Creating graph with {} nodes and {} edges".format(len(nodes),
+                                                             sum(len(x) for x in edges.values())))
+    dot = io.StringIO()
+    _emit_dot(dot, list(nodes), edges)
+    G = pygraphviz.AGraph(string=dot.getvalue())
+    G.draw(output_file, format='svg', prog='dot')
 
     print("Written diagram to {}".format(output_file))
 
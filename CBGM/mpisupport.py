@@ -24,6 +24,15 @@ def is_parent():
 CHILD_RETRY_HELLO = 60
 
 
+class MpiBatch(list):
+    """
+    A list of argument tuples that is sent to a child as a single message.
+    The child calls its function for each one and sends back an MpiBatch of
+    the results, in the same order.
+    """
+    pass
+
+
 class MpiParent(object):
     mpicomm = None
     mpi_queue = queue.Queue()
@@ -32,6 +41,8 @@ class MpiParent(object):
     mpi_child_meminfo = {}
     mpi_child_timeout = 3600
     mpi_child_ready_timeout = 30
+    mpi_batches_per_child = 4  # so slow tasks still balance across children
+    mpi_max_batch_size = 10  # also bounds how long a hung child can hold work
     mpi_parent_status = ""
 
     # WARNING - this operates as a singleton class - always using the
@@ -43,6 +54,46 @@ class MpiParent(object):
         self.__class__.latest_instance = self
         self.mpi_run()
 
+    @classmethod
+    def mpi_put_many(cls, tasks):
+        """
+        Put many tasks (argument tuples) in the queue, grouped into batches
+        (see mpi_batch_size), so each batch costs one message to and from a
+        child.
+
+        A batch is allowed mpi_child_timeout for each of its tasks - see
+        mpi_task_timeout.
+        """
+        tasks = list(tasks)
+        batch_size = cls.mpi_batch_size(len(tasks))
+        for i in range(0, len(tasks), batch_size):
+            cls.mpi_queue.put(MpiBatch(tasks[i:i + batch_size]))
+
+    @classmethod
+    def mpi_batch_size(cls, num_tasks):
+        """
+        How many of num_tasks tasks to put in each batch. Only batch when
+        there's enough work for every child to get mpi_batches_per_child
+        batches, and never more than mpi_max_batch_size.
+        """
+        if cls.mpicomm is None:
+            # No idea how many children there are
+            return 1
+
+        children = max(1, cls.mpicomm.size - 1)
+        return min(cls.mpi_max_batch_size,
+                   max(1, num_tasks // (cls.mpi_batches_per_child * children)))
+
+    @classmethod
+    def mpi_task_timeout(cls, args):
+        """
+        How long a child may take over this item from the queue - scaled up
+        for batches, since mpi_child_timeout is meant for a single task.
+        """
+        if isinstance(args, MpiBatch):
+            return cls.mpi_child_timeout * len(args)
+        return cls.mpi_child_timeout
+
     @classmethod
     def mpi_wait(cls, *, stop=True):
         """
@@ -157,10 +208,11 @@ class MpiParent(object):
 
             # get the results back
             start = time.time()
+            timeout = cls.mpi_task_timeout(args)
             while True:
                 while not cls.mpicomm.Iprobe(source=child):
                     time.sleep(1)
-                    if time.time() - start > cls.mpi_child_timeout:
+                    if time.time() - start > timeout:
                         logger.error("Child {} took too long to return. Aborting.".format(child))
                         stat(child, "timeout - task returned to the queue")
                         # Put it back on the queue for someone else to do
@@ -183,7 +235,11 @@ class MpiParent(object):
 
             # process the result by handing it to the latest_instance's
             # mpi_handle_result method.
-            cls.latest_instance.mpi_handle_result(args, ret)
+            if isinstance(args, MpiBatch):
+                for batch_args, batch_ret in zip(args, ret):
+                    cls.latest_instance.mpi_handle_result(batch_args, batch_ret)
+            else:
+                cls.latest_instance.mpi_handle_result(args, ret)
 
             cls.mpi_queue.task_done()
             stat(child, "task done")
@@ -286,7 +342,10 @@ def mpi_child(fn):
             break
 
         logger.debug("Child {} (remote) received data".format(rank))
-        ret = fn(*args)
+        if isinstance(args, MpiBatch):
+            ret = MpiBatch(fn(*x) for x in args)
+        else:
+            ret = fn(*args)
 
         mem_raw = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
         mem_size = resource.getpagesize()
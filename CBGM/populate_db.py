@@ -98,8 +98,9 @@ SCHEMA = ["CREATE TABLE cbgm (witness, variant_unit, label, text, parent);",
           "CREATE INDEX varidx ON cbgm (variant_unit);",
           "CREATE INDEX witidx ON cbgm (witness);",
           "CREATE INDEX labidx ON cbgm (label);",
-          "CREATE INDEX paridx ON cbgm (parent);",
-          "VACUUM;", "ANALYZE;"]
+          "CREATE INDEX paridx ON cbgm (parent);"]
+# Run once the data is in, so ANALYZE has something to gather statistics on
+POST_LOAD = ["VACUUM;", "ANALYZE;"]
 
 
 def create_database(data, all_mss, db_file, force=False):
@@ -111,6 +112,10 @@ def create_database(data, all_mss, db_file, force=False):
     if os.path.exists(db_file):
         if force:
             os.unlink(db_file)
+            # A stale WAL journal mustn't be applied to the new database
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(db_file + suffix):
+                    os.unlink(db_file + suffix)
         else:
             raise ValueError("File {} already exists".format(db_file))
 
@@ -137,17 +142,12 @@ def create_database(data, all_mss, db_file, force=False):
                     # Ignore these as the witness can't support any reading
                     continue
 
-                for ms in reading.ms_support:
-                    sql = ("""INSERT INTO cbgm
-                                  (witness, variant_unit, label, text, parent)
-                              VALUES (\"{}\", \"{}/{}\", \"{}\", \"{}\", \"{}\")"""
-                           .format(ms,
-                                   verse,
-                                   vu,
-                                   reading.label,
-                                   reading.greek,
-                                   reading.parent))
-                    c.execute(sql)
+                variant_unit = "{}/{}".format(verse, vu)
+                c.executemany("""INSERT INTO cbgm
+                                     (witness, variant_unit, label, text, parent)
+                                 VALUES (?, ?, ?, ?, ?)""",
+                              [(ms, variant_unit, reading.label, reading.greek, reading.parent)
+                               for ms in reading.ms_support])
 
             if all_mss - all_wits_found:
                 logger.warning("-------" * 10)
@@ -158,6 +158,8 @@ def create_database(data, all_mss, db_file, force=False):
                 logger.warning("-------" * 10)
 
     conn.commit()
+    for s in POST_LOAD:
+        c.execute(s)
     conn.close()
     logger.info("Wrote {} variant units".format(vu_count))
 
@@ -1,11 +1,10 @@
 # encoding: utf-8
 
-import sqlite3
 import logging
 import os
 import json
 from collections import defaultdict
-from .shared import pretty_p
+from .shared import pretty_p, open_db
 logger = logging.getLogger(__name__)
 
 
@@ -24,7 +23,7 @@ class Coherence(object):
         @param debug: show more columns for debugging
         @param use_cache: use the file cache for this db to speed things up
         """
-        self.conn = sqlite3.connect(db_file)
+        self.conn = open_db(db_file)
         self.cursor = self.conn.cursor()
         self.w1 = w1
         self.rows = []
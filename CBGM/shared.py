@@ -1,8 +1,10 @@
 # encoding: utf-8
 
 import re
+import os
 import string
 import logging
+import sqlite3
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +24,15 @@ UNCL = "UNCL"  # Unclear
 LAC = "LAC"  # Lacuna
 
 
+# Pragmas to apply to every read connection - CBGM runs are overwhelmingly
+# lookups against the cbgm table, so keep as much of it in memory as we can.
+# These only affect this connection - nothing is changed in the database
+# file itself, so read-only and shared (e.g. NFS) databases are fine.
+DB_PRAGMAS = ("PRAGMA cache_size=-200000",  # negative means KiB, so ~200MB
+              "PRAGMA temp_store=MEMORY")
+MAX_MMAP_SIZE = 2 << 30  # 2GB
+
+
 re_vref = re.compile("B([0-9]+)K([0-9]+)V([0-9]+)")
 re_context = re.compile(r"[^.]+\.(\d+|\w+)\.?(\d+)?")
 
@@ -41,6 +52,21 @@ def memoize(f):
     return helper
 
 
+def open_db(db_file):
+    """
+    Open a connection to the sqlite database, tuned for our read-heavy use.
+    """
+    conn = sqlite3.connect(db_file)
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+
+    if os.path.exists(db_file):
+        mmap_size = min(os.path.getsize(db_file) * 2, MAX_MMAP_SIZE)
+        conn.execute("PRAGMA mmap_size={}".format(mmap_size))
+
+    return conn
+
+
 def witintify(x):
     # return a sortable tuple representing this witness
     num_match = re.search('([0-9]+)', x)
@@ -3,7 +3,8 @@ import logging
 import tempfile
 import os
 import shutil
-from CBGM.local_stemma import local_stemma
+import io
+from CBGM.local_stemma import local_stemma, _emit_dot
 from CBGM import test_db
 from CBGM.test_logging import default_logging
 
@@ -124,3 +125,22 @@ d	ειδως	E"""
             data = f.read().strip()
 
         self.assertEqual(data, SVG)
+
+    def test_emit_dot(self):
+        """
+        Test the dot output for a local stemma, including quoting awkward labels
+        """
+        out = io.StringIO()
+        _emit_dot(out, ['a', 'b', '?', 'c"'], {'a': ['b'], '?': ['c"']})
+        exp = """strict digraph G {
+node [shape=plaintext; fontsize=12; height=0.4; width=0.4; fixedsize=true];
+edge [arrowsize=0.5];
+"a";
+"b";
+"?";
+"c\\"";
+"a" -> "b";
+"?" -> "c\\"";
+}
+"""
+        self.assertEqual(out.getvalue(), exp)
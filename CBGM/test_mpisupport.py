@@ -0,0 +1,66 @@
+from unittest import TestCase
+from collections import namedtuple
+import queue
+from CBGM import mpisupport
+
+FakeComm = namedtuple('FakeComm', ['size'])
+
+
+class QueueOnlyParent(mpisupport.MpiParent):
+    # Our own queue, so we don't disturb the shared one
+    mpi_queue = queue.Queue()
+    mpicomm = FakeComm(size=3)  # parent and two children
+    mpi_child_timeout = 60
+
+
+class TestMpiSupport(TestCase):
+    def setUp(self):
+        QueueOnlyParent.mpi_queue = queue.Queue()
+
+    def _queued(self):
+        ret = []
+        while not QueueOnlyParent.mpi_queue.empty():
+            ret.append(QueueOnlyParent.mpi_queue.get_nowait())
+        return ret
+
+    def test_mpi_batch_size(self):
+        """
+        Check batches are only used when there's enough work to go round all the children, and are capped
+        """
+        self.assertEqual(1, QueueOnlyParent.mpi_batch_size(7))
+        self.assertEqual(1, QueueOnlyParent.mpi_batch_size(15))
+        self.assertEqual(2, QueueOnlyParent.mpi_batch_size(16))
+        self.assertEqual(5, QueueOnlyParent.mpi_batch_size(40))
+        self.assertEqual(10, QueueOnlyParent.mpi_batch_size(1000))
+
+        class NoCommParent(QueueOnlyParent):
+            mpicomm = None
+        self.assertEqual(1, NoCommParent.mpi_batch_size(1000))
+
+    def test_mpi_put_many(self):
+        """
+        Check tasks are grouped into batches, in order
+        """
+        QueueOnlyParent.mpi_put_many(("TASK", i) for i in range(7))
+        batches = self._queued()
+        self.assertTrue(all(isinstance(x, mpisupport.MpiBatch) for x in batches))
+        self.assertEqual([[("TASK", i)] for i in range(7)], batches)
+
+        QueueOnlyParent.mpi_put_many(("TASK", i) for i in range(42))
+        batches = self._queued()
+        self.assertEqual([5] * 8 + [2], [len(x) for x in batches])
+        self.assertEqual([("TASK", i) for i in range(42)], [x for batch in batches for x in batch])
+
+    def test_mpi_put_many_empty(self):
+        """
+        Check nothing is queued when there are no tasks
+        """
+        QueueOnlyParent.mpi_put_many([])
+        self.assertEqual([], self._queued())
+
+    def test_mpi_task_timeout(self):
+        """
+        Check a batch gets the child timeout for each of its tasks
+        """
+        self.assertEqual(60, QueueOnlyParent.mpi_task_timeout(("TASK", 1)))
+        self.assertEqual(180, QueueOnlyParent.mpi_task_timeout(mpisupport.MpiBatch([("TASK", 1)] * 3)))
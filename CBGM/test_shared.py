@@ -1,4 +1,9 @@
 from unittest import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import contextlib
 
 from CBGM import shared
 
@@ -93,3 +98,23 @@ class TestShared(TestCase):
         # Composite case: B04K01V50/2-36,B04K01V51/2-22,B04K01V52/2-6
         self.assertEqual([401050, 2.36], shared.numify('B04K01V50/2-36,B04K01V51/2-22,B04K01V52/2-6'))
 
+    def test_open_db(self):
+        """
+        Check open_db only tunes the connection, and leaves the database file's journal mode alone
+        """
+        tmpdir = tempfile.mkdtemp(__name__)
+        try:
+            db_file = os.path.join(tmpdir, 'test.db')
+            with contextlib.closing(sqlite3.connect(db_file)) as conn:
+                conn.execute("CREATE TABLE cbgm (witness, variant_unit)")
+                conn.execute("INSERT INTO cbgm VALUES ('A', '22/3')")
+                conn.commit()
+
+            with contextlib.closing(shared.open_db(db_file)) as conn:
+                self.assertEqual([('A', '22/3')], list(conn.execute("SELECT * FROM cbgm")))
+                self.assertEqual([('delete', )], list(conn.execute("PRAGMA journal_mode")))
+                self.assertEqual([(2, )], list(conn.execute("PRAGMA temp_store")))
+
+            self.assertEqual(['test.db'], os.listdir(tmpdir))
+        finally:
+            shutil.rmtree(tmpdir)
@@ -3,6 +3,8 @@ import logging
 import os
 import tempfile
 import shutil
+import itertools
+from unittest import mock
 from CBGM import textual_flow
 from CBGM import test_db
 from CBGM.shared import INIT
@@ -223,6 +225,11 @@ class TestTextualFlow(TestCase):
         cls.test_db.cleanup()
         shutil.rmtree(cls.tmpdir)
 
+    def setUp(self):
+        # Start each test with a cold cache, so we don't just test loading
+        # whatever an earlier test stored
+        Coherence.CACHE_BASEDIR = tempfile.mkdtemp(dir=self.tmpdir)
+
     def test_get_parents_P75(self):
         """
         Test the get_parents method for P75
@@ -239,6 +246,132 @@ class TestTextualFlow(TestCase):
         exp = {'499': [ParentCombination('07', 2, 82.92682926829268, 2, 2, 1, False)]}
         self.assertEqual(exp, ret)
 
+    def test_get_parents_multiple_connectivity(self):
+        """
+        Test the get_parents method gives the same answers for several connectivity values at once
+        """
+        connectivity = ["1", "2", "499", "85%", "50%"]
+        ret = textual_flow.get_parents('22/3', '0211', 'b', 'a', connectivity=connectivity,
+                                       db_file=self.test_db.db_file, min_strength=0)
+        for conn_value in connectivity:
+            single = textual_flow.get_parents('22/3', '0211', 'b', 'a', connectivity=[conn_value],
+                                              db_file=self.test_db.db_file, min_strength=0)
+            self.assertEqual(single[conn_value], ret[conn_value], conn_value)
+
+    def test_get_parents_progress(self):
+        """
+        Test get_parents reports its progress periodically while searching
+        """
+        clock = itertools.count(step=2)  # two seconds pass every time we look
+        with mock.patch.object(textual_flow.time, 'monotonic', lambda: next(clock)), \
+                self.assertLogs(textual_flow.logger, logging.DEBUG) as logs:
+            textual_flow.get_parents('22/52', '05', 'c', 'a&b', connectivity=["499"],
+                                     db_file=self.test_db.db_file, min_strength=0)
+
+        progress = [x for x in logs.output if 'parent combinations for' in x and 'so far' in x]
+        self.assertTrue(progress)
+
+    def test_search_limits(self):
+        """
+        Test mixed rank and percentage connectivity values get one bounded search of each kind
+        """
+        limits = {x: textual_flow._parse_connectivity(x) for x in ["5", "90%", "2", "60%"]}
+        self.assertEqual({(5, None): ["5", "2"], (None, 60.0): ["90%", "60%"]},
+                         textual_flow._search_limits(limits))
+        self.assertEqual({(499, None): ["499"]}, textual_flow._search_limits({"499": (499, None)}))
+
+    def test_get_reading_data(self):
+        """
+        Test the get_reading_data method fetches data for several variant units at once
+        """
+        ret = textual_flow.get_reading_data(self.test_db.db_file, ['22/3', '23/3'])
+        self.assertEqual({'22/3', '23/3'}, set(ret.keys()))
+        self.assertIn(('0211', 'b', 'a'), ret['22/3'])
+        self.assertIn(('P75', 'a', INIT), ret['23/3'])
+        # 01 is lacunose at 23/3
+        self.assertIn(('01', 'a', INIT), ret['22/3'])
+        self.assertNotIn('01', [x[0] for x in ret['23/3']])
+
+    def test_parent_maps_cache(self):
+        """
+        Check a second run for the same variant unit and settings reuses the cached parent maps
+        """
+        path = tempfile.mkdtemp(dir=self.tmpdir)
+        t1 = textual_flow.TextualFlow(self.test_db.db_file, variant_unit='22/52', connectivity=["5", "85%"],
+                                      path=path)
+        t1.calculate_textual_flow()
+        self.assertFalse(t1._parent_maps_from_cache)
+
+        # include_undirected defaults to None here, but textual_flow passes False - they're the same setting
+        t2 = textual_flow.TextualFlow(self.test_db.db_file, variant_unit='22/52', connectivity=["5", "85%"],
+                                      path=path, suffix='_again', include_undirected=False)
+        t2.calculate_textual_flow()
+        self.assertTrue(t2._parent_maps_from_cache)
+        self.assertEqual(t1.parents_by_conn, t2.parents_by_conn)
+
+    def test_parent_maps_cache_round_trip(self):
+        """
+        Check every kind of parent combination survives storing and loading the parent maps cache
+        """
+        path = tempfile.mkdtemp(dir=self.tmpdir)
+        t1 = textual_flow.TextualFlow(self.test_db.db_file, variant_unit='22/52', connectivity=["5", "85%"],
+                                      path=path)
+        t1.parents_by_conn = {"5": {w1: [] for w1, w1_reading, w1_parent in t1.reading_data},
+                              "85%": {w1: [] for w1, w1_reading, w1_parent in t1.reading_data}}
+        t1.parents_by_conn["5"]['05'] = [ParentCombination('03', 2, 87.5, 1, 4, 1, False),
+                                         ParentCombination('01', 5, 80.25, 2, 3, 3, True)]
+        t1.parents_by_conn["85%"]['01'] = [ParentCombination('OL_PARENT', -1, 100.0, 1)]
+        t1._store_parent_maps_cache()
+
+        t2 = textual_flow.TextualFlow(self.test_db.db_file, variant_unit='22/52', connectivity=["5", "85%"],
+                                      path=path)
+        self.assertTrue(t2._check_parent_maps_cache())
+        t2._load_parent_maps_cache()
+        self.assertEqual(t1.parents_by_conn, t2.parents_by_conn)
+
+    def test_parent_maps_cache_incomplete(self):
+        """
+        Check parent maps aren't cached if get_parents failed for any witness
+        """
+        path = tempfile.mkdtemp(dir=self.tmpdir)
+        t = textual_flow.TextualFlow(self.test_db.db_file, variant_unit='22/12', connectivity=["5"], path=path)
+        t.calculate_parents()
+        self.assertTrue(t._parent_maps_complete())
+
+        t.parents_by_conn["5"]['P75'] = None
+        t._store_parent_maps_cache()
+        self.assertFalse(t._check_parent_maps_cache())
+
+        del t.parents_by_conn["5"]['P75']
+        t._store_parent_maps_cache()
+        self.assertFalse(t._check_parent_maps_cache())
+
+    def test_jobs(self):
+        """
+        Check using several processes gives the same genealogical coherence caches and parents as doing it serially
+        """
+        variant_units = ['22/3', '22/52']
+        connectivity = ["5", "85%"]
+        results = []
+        for jobs in (1, 2):
+            Coherence.CACHE_BASEDIR = tempfile.mkdtemp(dir=self.tmpdir)
+            textual_flow.textual_flow(self.test_db.db_file, variant_units=variant_units, connectivity=connectivity,
+                                      path=tempfile.mkdtemp(dir=self.tmpdir), jobs=jobs)
+            gencoh = sorted(os.listdir(os.path.join(Coherence.CACHE_BASEDIR, 'GenealogicalCoherenceCache')))
+
+            # Read back the parent maps that were calculated
+            parents = {}
+            for vu in variant_units:
+                t = textual_flow.TextualFlow(self.test_db.db_file, variant_unit=vu, connectivity=connectivity,
+                                             path=tempfile.mkdtemp(dir=self.tmpdir))
+                self.assertTrue(t._check_parent_maps_cache())
+                t._load_parent_maps_cache()
+                parents[vu] = t.parents_by_conn
+            results.append((gencoh, parents))
+
+        self.assertEqual(28, len(results[0][0]))  # every witness, and A
+        self.assertEqual(results[0], results[1])
+
     def test_textual_flow(self):
         """
         Check the high-level textual_flow method works for simple inputs
@@ -282,4 +415,24 @@ class TestTextualFlow(TestCase):
         edge_044_0141 = '044 -> 0141\t\t [color="#b43f3f",\n\t\t\tlabel="1 (89.2)",\n\t\t\tstyle=dotted];'
         self.assertIn(edge_044_0141, dotdata)
 
-        self.assertIn("subgraph cluster_reading {", dotdata)
\ No newline at end of file
+        self.assertIn("subgraph cluster_reading {", dotdata)
+
+    def test_render_with_jobs(self):
+        """
+        Check rendering the diagrams in several processes gives the same svg files as doing it serially
+        """
+        svgs = []
+        for jobs in (1, 2):
+            # Each run starts cold, so the second doesn't just reuse the first's parents
+            Coherence.CACHE_BASEDIR = tempfile.mkdtemp(dir=self.tmpdir)
+            path = tempfile.mkdtemp(dir=self.tmpdir)
+            ret = textual_flow.textual_flow(self.test_db.db_file, variant_units=['22/3'], connectivity=["5", "499"],
+                                            path=path, box_readings=True, jobs=jobs)
+            data = {}
+            for conn_value, output_file in ret.items():
+                for reading in ('a', 'b'):
+                    with open("{}_{}.svg".format(output_file, reading)) as f:
+                        data[(conn_value, reading)] = f.read()
+            svgs.append(data)
+
+        self.assertEqual(svgs[0], svgs[1])
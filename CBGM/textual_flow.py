@@ -1,12 +1,17 @@
 # encoding: utf-8
 
-import subprocess
-import sqlite3
 import logging
+import time
+import json
+import hashlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 import pygraphviz
 import string
 import os
-from .shared import OL_PARENT
+from collections import defaultdict
+from .shared import OL_PARENT, open_db
+from .pre_genealogical_coherence import Coherence
 from .genealogical_coherence import GenealogicalCoherence, ParentCombination, generate_genealogical_coherence_cache
 from . import mpisupport
 
@@ -35,18 +40,35 @@ for i, x in enumerate(['1/2'] + [str(x) for x in range(20)]):
 logger = logging.getLogger(__name__)
 
 
+# Lookup tables for darken, mapping each channel value to its darker value,
+# keyed by the amount to darken by.
+_DARKEN_LUTS = {}
+
+
 def darken(col, by=75):
     """
     Darken a colour by specified amount
     """
     assert col[0] == '#'
-    r, g, b = int(col[1:3], 16), int(col[3:5], 16), int(col[5:7], 16)
+    lut = _DARKEN_LUTS.get(by)
+    if lut is None:
+        lut = _DARKEN_LUTS[by] = bytes(max(i - by, 0) for i in range(256))
+    return '#' + bytes.fromhex(col[1:7]).translate(lut).hex()
+
+
+def _node_style(colour):
+    """
+    Graphviz node attributes for a witness with this fill colour
+    """
+    return {'color': darken(colour),
+            'fillcolor': colour,
+            'style': 'filled'}  # See http://www.graphviz.org/
 
-    def dark(x, by=by):
-        new = max(x - by, 0)
-        return str(hex(new))[2:]
 
-    return '#{:0>2}{:0>2}{:0>2}'.format(dark(r), dark(g), dark(b))
+# Node styles for the first char of a label (e.g. for b1 just use b). These
+# are shared between nodes, so don't modify them.
+NODE_STYLES = {k: _node_style(v) for k, v in COLOURMAP.items()}
+DEFAULT_NODE_STYLE = _node_style('#cccccc')
 
 
 class ForestError(Exception):
@@ -73,15 +95,33 @@ class MpiHandler(mpisupport.MpiParent):
         super().__init__()
         self.textual_flow_objects = {}
 
-    def queue_textual_flow(self, vu, **kwargs):
+    def textual_flows(self, variant_units, all_reading_data, **kwargs):
         """
-        Make a TextualFlow object, and get it to queue up all its MPI work.
+        Make a TextualFlow object for each variant unit, and get them all to
+        queue up their MPI work. Then wait for it all just once, and draw the
+        diagrams - so the children aren't left idle at the end of each
+        variant unit.
         """
-        print(kwargs)
         try:
-            tf = TextualFlow(variant_unit=vu, **kwargs, mpihandler=self)
-            self.textual_flow_objects[vu] = tf
-            tf.calculate_textual_flow()
+            for i, vu in enumerate(variant_units):
+                logger.debug("Queueing variant unit {} ({} of {})"
+                             .format(vu, i + 1, len(variant_units)))
+                tf = TextualFlow(variant_unit=vu, reading_data=all_reading_data[vu],
+                                 **kwargs, mpihandler=self)
+                if not tf.output_files:
+                    logger.info("Nothing to do - skipping variant unit {}".format(vu))
+                    continue
+
+                self.textual_flow_objects[vu] = tf
+                tf.calculate_parents()
+
+            logger.debug("Waiting for remote tasks")
+            self.mpi_wait(stop=False)
+            logger.debug("Remote tasks complete")
+
+            for vu in variant_units:
+                if vu in self.textual_flow_objects:
+                    self.textual_flow_objects[vu].draw_diagrams()
         except Exception:
             logger.exception("Fatal error")
             self.mpi_wait(stop=True)
@@ -113,6 +153,105 @@ class MpiHandler(mpisupport.MpiParent):
             raise KeyError("Unknown MPI child key: {}".format(key))
 
 
+def _parse_connectivity(conn_value):
+    """
+    Parse a connectivity value (e.g. "499" or "75%") into (max_rank, min_perc)
+    """
+    max_rank = None
+    min_perc = None
+    try:
+        if conn_value[-1] == '%':
+            min_perc = float(conn_value[:-1])
+            assert min_perc >= 0, "Percentage value must be between 0 and 100"
+            assert min_perc <= 100, "Percentage value must be between 0 and 100"
+        else:
+            max_rank = int(conn_value)
+    except ValueError:
+        logger.exception("Unable to parse connectivity value %s as int or float%%", conn_value)
+        raise SystemExit(2)
+
+    return max_rank, min_perc
+
+
+def _search_limits(limits):
+    """
+    Group the connectivity values by the search that covers them - one search
+    with the largest max_rank for all the rank values, and one with the
+    smallest min_perc for all the percentage values. Each value's
+    combinations are then a subset of its search's results.
+
+    @param limits: dict of connectivity value to (max_rank, min_perc)
+
+    Returns a dict of (max_rank, min_perc) to list of connectivity values.
+    """
+    ranks = [k for k, v in limits.items() if v[0] is not None]
+    percs = [k for k, v in limits.items() if v[1] is not None]
+    searches = {}
+    if ranks:
+        searches[(max(limits[k][0] for k in ranks), None)] = ranks
+    if percs:
+        searches[(None, min(limits[k][1] for k in percs))] = percs
+    return searches
+
+
+def _within_limits(combination, max_rank, min_perc):
+    """
+    Does every parent in this combination satisfy the connectivity limits?
+    """
+    return all((max_rank is None or x.rank <= max_rank) and (min_perc is None or x.perc >= min_perc)
+               for x in combination)
+
+
+class _BestParents(object):
+    """
+    The best parent combinations seen so far for one connectivity value.
+    """
+    max_acceptable_gen = 2  # only allow my reading or my parent's
+
+    def __init__(self):
+        self.found = False  # have we been offered any combinations at all?
+        # we might need multiple parents if a reading requires it
+        self.best_parents_by_rank = []
+        self.best_rank = None
+        self.best_parents_by_gen = []
+        self.best_gen = None
+        self.best_gen_rank = None  # rank of best_parents_by_gen
+
+    def add(self, combination, rank, gen):
+        """
+        Consider this combination, with its worst rank and generation. An
+        empty combination (nothing could explain the reading) has no rank or
+        generation, and only counts as having found something.
+        """
+        self.found = True
+        if not combination or gen > self.max_acceptable_gen:
+            return
+
+        if self.best_gen is None or gen < self.best_gen:
+            self.best_parents_by_gen = combination
+            self.best_gen = gen
+            self.best_gen_rank = rank
+        elif gen == self.best_gen:
+            if rank < self.best_gen_rank:
+                # This is a better option for this generation
+                self.best_parents_by_gen = combination
+                self.best_gen_rank = rank
+
+        if self.best_rank is None or rank < self.best_rank:
+            self.best_parents_by_rank = combination
+            self.best_rank = rank
+
+    def parents(self):
+        """
+        The best parents found
+        """
+        if self.best_gen == 1:
+            # We can do this with direct parents - use them
+            return self.best_parents_by_gen
+        # Got to use ancestors, so use the best by rank
+        return self.best_parents_by_rank
+
+
 def get_parents(variant_unit, w1, w1_reading, w1_parent, connectivity, db_file, min_strength, include_undirected=False):
     """
     Calculate the best parents for this witness at this variant unit
@@ -136,98 +275,123 @@ def get_parents(variant_unit, w1, w1_reading, w1_parent, connectivity, db_file,
     coh.set_variant_unit(variant_unit)
 
     logger.debug("Searching parent combinations")
-    max_acceptable_gen = 2  # only allow my reading or my parent's
-    parent_maps = {}
-    for conn_value in connectivity:
-        logger.debug("Calculating for conn={}".format(conn_value))
+    limits = {conn_value: _parse_connectivity(conn_value) for conn_value in connectivity}
 
-        max_rank = None
-        min_perc = None
-        try:
-            if conn_value[-1] == '%':
-                min_perc = float(conn_value[:-1])
-                assert min_perc >= 0, "Percentage value must be between 0 and 100"
-                assert min_perc <= 100, "Percentage value must be between 0 and 100"
-            else:
-                max_rank = int(conn_value)
-        except ValueError:
-            logger.exception("Unable to parse connectivity value %s as int or float%%", conn_value)
-            raise SystemExit(2)
+    # Every connectivity value gives a subset of the combinations found with
+    # the loosest value of the same kind, so we only need to search once for
+    # the ranks and once for the percentages. Each combination is scored (by
+    # its worst rank and generation) once, and offered to every connectivity
+    # value it satisfies as it's generated - so we never hold them all.
+    parent_maps = {}
+    debug = logger.isEnabledFor(logging.DEBUG)
+    for (search_rank, search_perc), conn_values in _search_limits(limits).items():
+        bests = {conn_value: _BestParents() for conn_value in conn_values}
+        count = 0
+        last_report = time.monotonic()
         try:
-            combinations = coh.parent_combinations(w1_reading, w1_parent, max_rank=max_rank, min_perc=min_perc,
-                                                   include_undirected=include_undirected)
+            for combination in coh.iter_parent_combinations(w1_reading, w1_parent, max_rank=search_rank,
+                                                            min_perc=search_perc,
+                                                            include_undirected=include_undirected):
+                count += 1
+                if debug and time.monotonic() - last_report > 1.0:
+                    # We don't know the total up front, so report every second
+                    logger.debug("Searched %s parent combinations for %s so far", count, conn_values)
+                    last_report = time.monotonic()
+
+                if not combination:
+                    # Couldn't find anything to explain it
+                    logger.info("Couldn't find any parent combination for %s", w1_reading)
+                    rank = gen = None
+                else:
+                    rank = max(x.rank for x in combination)
+                    gen = max(x.gen for x in combination)
+
+                for conn_value in conn_values:
+                    max_rank, min_perc = limits[conn_value]
+                    if min_perc is None:
+                        if rank is not None and rank > max_rank:
+                            continue
+                    elif not _within_limits(combination, max_rank, min_perc):
+                        continue
+
+                    bests[conn_value].add(combination, rank, gen)
         except Exception:
             logger.exception("Couldn't get parent combinations for {}, {}, {}"
-                             .format(w1_reading, w1_parent, conn_value))
-            parent_maps[conn_value] = None
+                             .format(w1_reading, w1_parent, conn_values))
+            parent_maps.update((conn_value, None) for conn_value in conn_values)
             continue
 
-        # we might need multiple parents if a reading requires it
-        best_parents_by_rank = []
-        best_rank = None
-        best_parents_by_gen = []
-        best_gen = None
-        total = len(combinations)
-        report = int(total // 10)
-        for i, combination in enumerate(combinations):
-            count = i + 1
-            if (report and not count % report) or count == total:
-                # Report every 10% and at the end
-                logger.debug("Done %s of %s (%.2f%%)", count, total, (count / total) * 100.0)
-
-            if not combination:
-                # Couldn't find anything to explain it
-                logger.info("Couldn't find any parent combination for %s", w1_reading)
-                continue
-
-            rank = max(x.rank for x in combination)
-            gen = max(x.gen for x in combination)
-            if gen > max_acceptable_gen:
-                continue
+        logger.debug("Searched %s parent combinations for %s", count, conn_values)
 
-            if best_gen is None or gen < best_gen:
-                best_parents_by_gen = combination
-                best_gen = gen
-            elif gen == best_gen:
-                if rank < max(x.rank for x in best_parents_by_gen):
-                    # This is a better option for this generation
-                    best_parents_by_gen = combination
-                    best_gen = gen
-
-            if best_rank is None or rank < best_rank:
-                best_parents_by_rank = combination
-                best_rank = rank
-
-        logger.debug("Analysing results")
-        parents = []
-        if combinations:
-            if best_gen == 1:
-                # We can do this with direct parents - use them
-                parents = best_parents_by_gen
-            else:
-                # Got to use ancestors, so use the best by rank
-                parents = best_parents_by_rank
-
-            if w1_parent == OL_PARENT and not parents:
+        for conn_value in conn_values:
+            parents = bests[conn_value].parents()
+            if bests[conn_value].found and w1_parent == OL_PARENT and not parents:
                 # Top level in an overlapping unit with an omission in the initial text
                 parents = [ParentCombination('OL_PARENT', -1, 100.0, 1)]
 
-        logger.debug("Found best parents for {} (conn={}): {}".format(w1, conn_value, parents))
-        if min_strength:
-            for parent in parents:
-                if not include_undirected:
-                    assert parent.strength >= min_strength, "Parent is too weak - something has gone wrong {}".format(parent)
+            logger.debug("Found best parents for {} (conn={}): {}".format(w1, conn_value, parents))
+            if min_strength:
+                for parent in parents:
+                    if not include_undirected:
+                        assert parent.strength >= min_strength, "Parent is too weak - something has gone wrong {}".format(parent)
+
+            parent_maps[conn_value] = parents
+
+    return {conn_value: parent_maps[conn_value] for conn_value in connectivity}
+
+
+def _init_worker(cache_basedir):
+    """
+    Set up a pool worker process - which only inherits our settings if it
+    was forked, and not with the forkserver or spawn start methods.
+    """
+    Coherence.CACHE_BASEDIR = cache_basedir
+
+
+def _get_parents_star(args):
+    """
+    Call get_parents with a tuple of arguments - for use with executor.map
+    """
+    return get_parents(*args)
+
 
-        parent_maps[conn_value] = parents
+def render_svg(dotfile, svgfile):
+    """
+    Lay out the graph in dotfile and render it to svgfile, using graphviz's
+    library rather than running dot.
+    """
+    pygraphviz.AGraph(dotfile).draw(svgfile, format='svg', prog='dot')
+    logger.info("Written to {} and {}".format(dotfile, svgfile))
 
-    return parent_maps
+
+def get_reading_data(db_file, variant_units):
+    """
+    Fetch the (witness, label, parent) combinations for all the specified
+    variant units in one go.
+
+    Returns a dict of variant unit to list of (witness, label, parent).
+    """
+    reading_data = {vu: [] for vu in variant_units}
+    # Query in chunks, to stay well within sqlite's limit on host parameters
+    chunk_size = 500
+    with contextlib.closing(open_db(db_file)) as conn:
+        for i in range(0, len(variant_units), chunk_size):
+            chunk = variant_units[i:i + chunk_size]
+            sql = """SELECT variant_unit, witness, label, parent
+                     FROM cbgm
+                     WHERE variant_unit IN ({})
+                     """.format(', '.join('?' * len(chunk)))
+            for vu, witness, label, parent in conn.execute(sql, chunk):
+                reading_data[vu].append((witness, label, parent))
+
+    return reading_data
 
 
 def textual_flow(db_file, *, variant_units, connectivity, perfect_only=False,
                  ranks_on_edges=True, include_perc_in_label=True, show_strengths=True,
                  weak_strength_threshold=25, very_weak_strength_threshold=5,
                  show_strength_values=False, suffix='', box_readings=False, force_serial=False,
-                 min_strength=None, include_undirected=False, path='.'):
+                 min_strength=None, include_undirected=False, path='.', jobs=1):
     """
     Create a textual flow diagram for the specified variant units. This will
     work out if we're using MPI and act accordingly...
@@ -235,6 +399,9 @@ def textual_flow(db_file, *, variant_units, connectivity, perfect_only=False,
     If you specify a single variant unit, and don't use MPI... then the output
     files dict will be returned. Otherwise None.
 
+    Without MPI, jobs > 1 will use that many local processes for the
+    expensive calculations.
+
     See TextualFlow class for a description of the arguments here.
     """
     if 'OMPI_COMM_WORLD_SIZE' in os.environ and not force_serial:
@@ -252,65 +419,83 @@ def textual_flow(db_file, *, variant_units, connectivity, perfect_only=False,
             mpisupport.mpi_child(mpi_child_wrapper)
             return "MPI child"
 
-    # First generate genealogical coherence cache
-    sql = "SELECT DISTINCT(witness) FROM cbgm"
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    witnesses = [x[0] for x in list(cursor.execute(sql))]
-    for i, w1 in enumerate(witnesses):
+    # Without MPI, one pool of local processes is shared by all the variant
+    # units, rather than starting new processes for each one
+    executor = None
+    if not mpi_mode and jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                       initargs=(Coherence.CACHE_BASEDIR, ))
+
+    try:
+        # First generate genealogical coherence cache
+        sql = "SELECT DISTINCT(witness) FROM cbgm"
+        with contextlib.closing(open_db(db_file)) as conn:
+            witnesses = [x[0] for x in conn.execute(sql)]
         if mpi_mode:
-            mpihandler.mpi_queue.put(("GENCOH", w1, db_file, min_strength))
+            mpihandler.mpi_put_many(("GENCOH", w1, db_file, min_strength) for w1 in witnesses)
+        elif executor:
+            logger.debug("Generating genealogical coherence for {} witnesses with {} processes"
+                         .format(len(witnesses), jobs))
+            list(executor.map(generate_genealogical_coherence_cache, witnesses,
+                              [db_file] * len(witnesses), [min_strength] * len(witnesses)))
         else:
-            logger.debug("Generating genealogical coherence for W1={} ({}/{})".format(w1, i, len(witnesses)))
-            generate_genealogical_coherence_cache(w1, db_file, min_strength)
+            for i, w1 in enumerate(witnesses):
+                logger.debug("Generating genealogical coherence for W1={} ({}/{})".format(w1, i, len(witnesses)))
+                generate_genealogical_coherence_cache(w1, db_file, min_strength)
 
-    if mpi_mode:
-        # Wait for the queue, but leave the remote children running
-        mpihandler.mpi_wait(stop=False)
+        if mpi_mode:
+            # Wait for the queue, but leave the remote children running
+            mpihandler.mpi_wait(stop=False)
 
-    # Now make textual flow diagrams
-    if mpi_mode:
-        if mpi_parent:
-            for i, vu in enumerate(variant_units):
-                logger.debug("Running for variant unit {} ({} of {})"
-                             .format(vu, i + 1, len(variant_units)))
-                mpihandler.queue_textual_flow(
-                    vu, db_file=db_file, connectivity=connectivity, perfect_only=perfect_only,
-                    ranks_on_edges=ranks_on_edges, include_perc_in_label=include_perc_in_label,
-                    show_strengths=show_strengths, weak_strength_threshold=weak_strength_threshold,
+        # Now make textual flow diagrams
+        all_reading_data = get_reading_data(db_file, variant_units)
+        if mpi_mode:
+            if mpi_parent:
+                mpihandler.textual_flows(
+                    variant_units, all_reading_data, db_file=db_file, connectivity=connectivity,
+                    perfect_only=perfect_only, ranks_on_edges=ranks_on_edges,
+                    include_perc_in_label=include_perc_in_label, show_strengths=show_strengths,
+                    weak_strength_threshold=weak_strength_threshold,
                     very_weak_strength_threshold=very_weak_strength_threshold,
                     show_strength_values=show_strength_values, suffix=suffix, box_readings=box_readings,
                     min_strength=min_strength, include_undirected=include_undirected, path=path)
 
-            return mpihandler.mpi_wait(stop=True)
-        else:
-            # MPI child - nothing to do as the children are already running
-            pass
+                return mpihandler.mpi_wait(stop=True)
+            else:
+                # MPI child - nothing to do as the children are already running
+                pass
 
-    else:
-        for i, vu in enumerate(variant_units):
-            logger.debug("Running for variant unit {} ({} of {})"
-                         .format(vu, i + 1, len(variant_units)))
-            t = TextualFlow(db_file, variant_unit=vu, connectivity=connectivity, perfect_only=perfect_only,
-                            ranks_on_edges=ranks_on_edges, include_perc_in_label=include_perc_in_label,
-                            show_strengths=show_strengths, weak_strength_threshold=weak_strength_threshold,
-                            very_weak_strength_threshold=very_weak_strength_threshold,
-                            show_strength_values=show_strength_values, suffix=suffix, box_readings=box_readings,
-                            min_strength=min_strength, include_undirected=include_undirected, path=path)
-            t.calculate_textual_flow()
-
-        if len(variant_units) == 1:
-            return t.output_files
+        else:
+            for i, vu in enumerate(variant_units):
+                logger.debug("Running for variant unit {} ({} of {})"
+                             .format(vu, i + 1, len(variant_units)))
+                t = TextualFlow(db_file, variant_unit=vu, connectivity=connectivity, perfect_only=perfect_only,
+                                ranks_on_edges=ranks_on_edges, include_perc_in_label=include_perc_in_label,
+                                show_strengths=show_strengths, weak_strength_threshold=weak_strength_threshold,
+                                very_weak_strength_threshold=very_weak_strength_threshold,
+                                show_strength_values=show_strength_values, suffix=suffix, box_readings=box_readings,
+                                min_strength=min_strength, include_undirected=include_undirected, path=path,
+                                reading_data=all_reading_data[vu], executor=executor)
+                t.calculate_textual_flow()
+
+            if len(variant_units) == 1:
+                return t.output_files
+    finally:
+        if executor:
+            executor.shutdown()
 
     return None
 
 
 class TextualFlow(object):
+    parent_maps_cache_version = 2  # change this if the parent maps cache format changes
+
     def __init__(self, db_file, *, variant_unit, connectivity, perfect_only=False,
                  ranks_on_edges=True, include_perc_in_label=True, show_strengths=True,
                  weak_strength_threshold=25, very_weak_strength_threshold=5,
                  show_strength_values=False, suffix='', box_readings=False,
-                 min_strength=None, include_undirected=None, path='.', mpihandler=None):
+                 min_strength=None, include_undirected=None, path='.', mpihandler=None, reading_data=None,
+                 executor=None):
         """
         @param db_file: sqlite database
         @param variant_unit: draw the textual flow of this variant unit
@@ -328,6 +513,8 @@ class TextualFlow(object):
         @param include_undirected: Include undirected relationships (as a group)
         @param path: the path under which to write the output files
         @param mpihandler: optional MpiHandler instance
+        @param reading_data: optional pre-loaded (witness, label, parent) list for this variant unit
+        @param executor: optional concurrent.futures executor for calculating parents and rendering (ignored with MPI)
         """
         assert type(connectivity) == list, "Connectivity must be a list (was %s)" % connectivity
         # Fast abort if it already exists
@@ -336,14 +523,13 @@ class TextualFlow(object):
         self.connectivity = []
 
         # Fetch reading info
-        sql = """SELECT witness, label, parent
-                    FROM cbgm
-                    WHERE variant_unit = \"{}\"
-                    """.format(variant_unit)
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
-        self.reading_data = list(cursor.execute(sql))  # (witness, label, parent) combinations
-        self.readings = set(x[1] for x in self.reading_data)  # just the unique reading labels
+        if reading_data is None:
+            reading_data = get_reading_data(db_file, [variant_unit])[variant_unit]
+        self.reading_data = reading_data  # (witness, label, parent) combinations
+        self.witnesses_by_reading = defaultdict(list)  # {label: [witness, ...]}
+        for w1, w1_reading, w1_parent in self.reading_data:
+            self.witnesses_by_reading[w1_reading].append(w1)
+        self.readings = set(self.witnesses_by_reading)  # just the unique reading labels
 
         # Work out if we can quickly abort, and calculate the output filenames
         for conn_value in connectivity:
@@ -387,9 +573,11 @@ class TextualFlow(object):
         self.show_strength_values = show_strength_values
         self.suffix = suffix
         self.box_readings = box_readings
-        self.parent_maps = {}
+        self.parents_by_conn = {}  # {conn_value: {w1: parents}}
+        self._parent_maps_from_cache = False
         self.min_strength = min_strength
         self.include_undirected = include_undirected
+        self.executor = executor
 
     def calculate_textual_flow(self):
         """
@@ -403,6 +591,24 @@ class TextualFlow(object):
             logger.info("Nothing to do - skipping variant unit {}".format(self.variant_unit))
             return
 
+        self.calculate_parents()
+
+        if self.mpihandler and not self._parent_maps_from_cache:
+            # Wait a little for stabilisation
+            logger.debug("Waiting for remote tasks")
+            self.mpihandler.mpi_wait(stop=False)
+            logger.debug("Remote tasks complete")
+
+        self.draw_diagrams()
+
+    def calculate_parents(self):
+        """
+        Calculate the best parent(s) for each witness, at each connectivity
+        value, or load them from the cache.
+
+        With MPI this just queues up the work - the caller must wait for the
+        queue before calling draw_diagrams.
+        """
         logger.info("Creating textual flow diagram for {}".format(self.variant_unit))
         logger.info("Setting connectivity to {}".format(self.connectivity))
         if self.perfect_only:
@@ -411,84 +617,189 @@ class TextualFlow(object):
         if self.min_strength:
             logger.info("Setting min strength = %s", self.min_strength)
 
-        # 1. Calculate the best parent for each witness
-        for i, (w1, w1_reading, w1_parent) in enumerate(self.reading_data):
-            if self.mpihandler:
-                self.mpihandler.mpi_queue.put(("PARENTS", self.variant_unit, w1,
-                                               w1_reading, w1_parent,
-                                               self.connectivity, self.db_file,
-                                               self.min_strength, self.include_undirected))
-            else:
+        if self._check_parent_maps_cache():
+            self._load_parent_maps_cache()
+        elif self.mpihandler:
+            self.mpihandler.mpi_put_many(("PARENTS", self.variant_unit, w1,
+                                          w1_reading, w1_parent,
+                                          self.connectivity, self.db_file,
+                                          self.min_strength, self.include_undirected)
+                                         for (w1, w1_reading, w1_parent) in self.reading_data)
+        elif self.executor:
+            logger.debug("Calculating parents for {} witnesses in parallel".format(len(self.reading_data)))
+            tasks = [(self.variant_unit, w1, w1_reading, w1_parent, self.connectivity, self.db_file,
+                      self.min_strength, self.include_undirected)
+                     for (w1, w1_reading, w1_parent) in self.reading_data]
+            for args, parent_maps in zip(tasks, self.executor.map(_get_parents_star, tasks)):
+                self._add_parent_maps(args[1], parent_maps)
+        else:
+            for i, (w1, w1_reading, w1_parent) in enumerate(self.reading_data):
                 logger.debug("Calculating parents {}/{}".format(i, len(self.readings)))
                 parent_maps = get_parents(self.variant_unit, w1, w1_reading, w1_parent,
                                           self.connectivity, self.db_file,
                                           min_strength=self.min_strength,
                                           include_undirected=self.include_undirected)
-                self.parent_maps[w1] = parent_maps  # a parent map per connectivity setting
+                self._add_parent_maps(w1, parent_maps)
 
-        if self.mpihandler:
-            # Wait a little for stabilisation
-            logger.debug("Waiting for remote tasks")
-            self.mpihandler.mpi_wait(stop=False)
-            logger.debug("Remote tasks complete")
+    def draw_diagrams(self):
+        """
+        Draw the diagrams, once calculate_parents has done its work.
+        """
+        if not self._parent_maps_from_cache:
+            self._store_parent_maps_cache()
 
-        # Now self.parent_maps should be complete
-        logger.debug("Parent maps are: {}".format(self.parent_maps))
+        # Now self.parents_by_conn should be complete
+        logger.debug("Parents are: {}".format(self.parents_by_conn))
 
-        # 2. Draw the diagrams
+        # Write the dot files
+        drawings = []
         for conn_value in self.connectivity:
+            parents_for_conn = self.parents_by_conn.get(conn_value, {})
             if self.box_readings:
-                self._draw_box_diagrams(conn_value)
+                drawings.extend(self._draw_box_diagrams(conn_value, parents_for_conn))
             else:
-                self._draw_diagram(conn_value)
+                drawings.append(self._draw_diagram(conn_value, parents_for_conn))
+
+        # Lay them out and render them. Each one is independent, but
+        # graphviz holds the GIL, so use processes rather than threads.
+        if self.executor and len(drawings) > 1:
+            logger.debug("Rendering {} diagrams in parallel".format(len(drawings)))
+            list(self.executor.map(render_svg, *zip(*drawings)))
+        else:
+            for dotfile, svgfile in drawings:
+                render_svg(dotfile, svgfile)
 
         if self.mpihandler:
             self.mpihandler.done(self.variant_unit)
 
-    def _draw_box_diagrams(self, conn_value):
+    def _add_parent_maps(self, w1, parent_maps):
+        """
+        Store the parent map (from get_parents) for this witness, by connectivity value
+        """
+        for conn_value, parents in parent_maps.items():
+            self.parents_by_conn.setdefault(conn_value, {})[w1] = parents
+
+    @property
+    def _parent_maps_cache_key(self):
+        """
+        Cache filename for the parent maps - which depend on the data, the
+        connectivity values and the strength settings, but not on the drawing.
+        """
+        settings = repr((self.parent_maps_cache_version, self.connectivity, self.min_strength,
+                         bool(self.include_undirected)))
+        return os.path.join(Coherence.CACHE_BASEDIR,
+                            "{}Cache".format(self.__class__.__name__),
+                            "{}.{}.{}.cache".format(self.db_file.replace('/', '_'),
+                                                   self.variant_unit.replace('/', '_'),
+                                                   hashlib.sha1(settings.encode()).hexdigest()))
+
+    def _check_parent_maps_cache(self):
+        """
+        Does an up-to-date cache entry exist for our parent maps?
+        """
+        cache_key = self._parent_maps_cache_key
+        return (os.path.exists(cache_key) and
+                os.path.getmtime(cache_key) > os.path.getmtime(self.db_file))
+
+    def _parent_maps_complete(self):
+        """
+        Do we have parents for every witness at every connectivity value? If
+        get_parents failed for a witness, we'll have None.
+        """
+        return all(self.parents_by_conn.get(conn_value, {}).get(w1) is not None
+                   for conn_value in self.connectivity
+                   for w1, w1_reading, w1_parent in self.reading_data)
+
+    def _store_parent_maps_cache(self):
+        """
+        Store our parent maps in a cache - unless they're incomplete, as we
+        don't want to keep reusing a failure.
+        """
+        if not self._parent_maps_complete():
+            logger.warning("Not caching parent maps for {} - some couldn't be calculated"
+                           .format(self.variant_unit))
+            return
+
+        cache_key = self._parent_maps_cache_key
+        try:
+            os.mkdir(os.path.dirname(cache_key))
+        except FileExistsError:
+            # Easier than checking and risking race conditions
+            pass
+
+        data = {conn_value: {w1: [[x.parent, x.rank, x.perc, x.gen, x.prior, x.posterior, x.undirected]
+                                  for x in parents]
+                             for w1, parents in parents_for_conn.items()}
+                for conn_value, parents_for_conn in self.parents_by_conn.items()}
+        with open(cache_key, 'w') as f:
+            json.dump(data, f)
+
+        logger.debug("Stored parent maps cache to {}".format(cache_key))
+
+    def _load_parent_maps_cache(self):
+        """
+        Load our parent maps from a cache. You must use _check_parent_maps_cache
+        before calling this.
+        """
+        cache_key = self._parent_maps_cache_key
+        with open(cache_key) as f:
+            data = json.load(f)
+
+        self.parents_by_conn = {conn_value: {w1: [ParentCombination(*x) for x in parents]
+                                             for w1, parents in parents_for_conn.items()}
+                                for conn_value, parents_for_conn in data.items()}
+
+        self._parent_maps_from_cache = True
+        logger.debug("Loaded parent maps for {} from cache ({})".format(self.variant_unit, cache_key))
+
+    def _draw_box_diagrams(self, conn_value, parents_for_conn):
         """
         Make a diagram for each reading, showing those witnesses attesting the reading in a box, and their direct
         ancestors (attesting a different reading) outside the box.
+
+        Returns a list of drawings, as for _draw_diagram.
         """
+        drawings = []
         for reading in self.readings:
-            want_witnesses = set()
-            for w1, w1_reading, w1_parent in self.reading_data:
-                if w1_reading != reading:
-                    continue
-
-                # This witness has our reading
-                want_witnesses.add(w1)
-
+            # These witnesses have our reading
+            want_witnesses = set(self.witnesses_by_reading[reading])
+            for w1 in self.witnesses_by_reading[reading]:
                 # We need to include the direct parents of this too
-                parents = self.parent_maps[w1][conn_value]
+                parents = parents_for_conn[w1]
                 if parents is not None:
                     want_witnesses |= set(x.parent for x in parents)
 
             logger.info("Drawing diagram for reading %s", reading)
-            self._draw_diagram(conn_value, include_witnesses=want_witnesses, group_reading=reading)
+            drawings.append(self._draw_diagram(conn_value, parents_for_conn,
+                                               include_witnesses=want_witnesses,
+                                               group_reading=reading))
+
+        return drawings
 
-    def _draw_diagram(self, conn_value, *, include_witnesses=None, group_reading=None):
+    def _draw_diagram(self, conn_value, parents_for_conn, *, include_witnesses=None, group_reading=None):
         """
-        Draw the textual flow diagram for the specified connectivity value
+        Draw the textual flow diagram for the specified connectivity value, with
+        parents_for_conn giving the parents of each witness ({w1: parents}).
 
         Include only those witnesses listed in include_witnesses - unless it's None, in which case include them all.
 
         Draw a box around witnesses attesting group_reading, if not None.
+
+        The dot file is written straight away, but laying out and rendering
+        the svg is left to the caller. Returns (dotfile, svgfile).
         """
         if not include_witnesses:
             # Include all witnesses
-            include_witnesses = set(x[0] for x in self.reading_data)
-
-        # Restrict the witnesses included
-        my_reading_data = [x for x in self.reading_data if x[0] in include_witnesses]
+            my_reading_data = self.reading_data
+        else:
+            # Restrict the witnesses included
+            my_reading_data = [x for x in self.reading_data if x[0] in include_witnesses]
 
-        # get the colour for the first char of the label (e.g. for b1 just get b)
-        witnesses = [(x[0], {'color': darken(COLOURMAP.get(x[1][0], '#cccccc')),
-                             'fillcolor': COLOURMAP.get(x[1][0], '#cccccc'),
-                             'style': 'filled'})  # See http://www.graphviz.org/
+        # get the style for the first char of the label (e.g. for b1 just get b)
+        witnesses = [(x[0], NODE_STYLES.get(x[1][0], DEFAULT_NODE_STYLE))
                      for x in my_reading_data]
 
-        witness_names = [x[0] for x in witnesses]
+        witness_names = set(x[0] for x in witnesses)
 
         G = pygraphviz.AGraph(strict=True, directed=True)
 
@@ -500,7 +811,7 @@ class TextualFlow(object):
             if w1_reading == group_reading:
                 subgraph_members.add(w1)
 
-            parents = self.parent_maps[w1][conn_value]
+            parents = parents_for_conn[w1]
             if parents is None:
                 # Couldn't calculate them
                 parents = []
@@ -569,8 +880,7 @@ class TextualFlow(object):
 
         # Add the nodes
         for wit, args in witnesses:
-            args['label'] = node_label_map[wit]
-            G.add_node(wit, **args)
+            G.add_node(wit, label=node_label_map[wit], **args)
 
         # Add legend if needed
         if self.show_strengths:
@@ -603,10 +913,7 @@ class TextualFlow(object):
 
         G.write(dotfile)
 
-        with open(svgfile, 'w') as sf:
-            subprocess.check_call(['dot', '-Tsvg', dotfile], stdout=sf)
-
-        logger.info("Written to {} and {}".format(dotfile, svgfile))
+        return dotfile, svgfile
 
     def mpi_result(self, args, ret):
         """
@@ -616,4 +923,4 @@ class TextualFlow(object):
         """
         # WARNING: We assume the second argument to get_parents is W1
         w1 = args[1]
-        self.parent_maps[w1] = ret  # a parent map per connectivity setting
+        self._add_parent_maps(w1, ret)